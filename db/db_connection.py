@@ -1,92 +1,330 @@
 import asyncio
+import contextvars
+import math
+import time
 
-from sqlalchemy import text
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
 
+from db.result import CompactResult
+from utils.config import settings
 from utils.logger import setup_logger
+from utils.tracing import current_trace, span
+
+
+def _track_cursor(conn, cursor, statement, parameters, context, executemany):
+    # Remember the running cursor so a missed deadline can cancel it from the event loop
+    conn.info["cursor"] = cursor
 
 
 class DbConnection:
-    def __init__(self, conn_string: str, timeout: int = 60):
+    def __init__(
+        self,
+        conn_string: str,
+        timeout: int = 60,
+        deadline: float = settings.tool_deadline,
+        min_connections: int = 0,
+        validation_interval: int = settings.pool_validation_interval
+    ):
         self.conn_string = conn_string
-        self.engine = create_async_engine(
-            conn_string, 
-            pool_pre_ping=True
-        )
+        self.min_connections = min_connections
+        self.validation_interval = validation_interval
+        self.engine = self._create_engine()
 
-        self.conn: AsyncConnection | None = None
         self.timeout = timeout
+        self.deadline = deadline
         
         self._timeout_task: asyncio.Task | None = None
+        self._validation_task: asyncio.Task | None = None
+        self._discard_tasks: set[asyncio.Task] = set()
         self.logger = setup_logger("DB Connection Async", "db_connection_async.log")
 
+    def _create_engine(self):
+        options = {
+            # Idle connections are validated in the background instead of on every checkout
+            "pool_pre_ping": self.validation_interval <= 0,
+        }
+
+        if self.min_connections > 5:
+            options["pool_size"] = self.min_connections
+
+        with span("create_engine"):
+            engine = create_async_engine(self.conn_string, **options)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _track_cursor)
+
+        return engine
+
+    @property
+    def target(self) -> str:
+        url = self.engine.url
+        return f"{url.get_backend_name()}://{url.host}:{url.port}/{url.database}"
+
+    def _start_validation(self):
+        if self.validation_interval <= 0:
+            return
+
+        if not self._validation_task or self._validation_task.done():
+            # Fresh context so the long-lived task does not hold on to the caller's trace
+            self._validation_task = asyncio.create_task(self._validate_periodically(), context=contextvars.Context())
+
+    async def _validate_periodically(self):
+        try:
+            while True:
+                await asyncio.sleep(self.validation_interval)
+                await self.validate_pool()
+        except asyncio.CancelledError:
+            pass
+
+    async def validate_pool(self):
+        """Ping idle pooled connections, drop dead ones and top the pool back up."""
+
+        idle = self.engine.pool.checkedin()
+        conns = []
+
+        try:
+            for _ in range(idle):
+                conns.append(await self.engine.connect())
+
+            for conn in conns:
+                try:
+                    await conn.run_sync(
+                        lambda sync_conn: sync_conn.dialect.do_ping(sync_conn.connection.dbapi_connection)
+                    )
+                except Exception as e:
+                    self.logger.warning(f"Discarding dead pooled connection ({e})")
+                    await conn.invalidate()
+        finally:
+            for conn in conns:
+                await conn.close()
+
+        # Invalidated connections stay in the pool and reconnect on their next checkout; do that now
+        if self.min_connections:
+            await self.prewarm()
+
+    async def prewarm(self, min_connections: int | None = None):
+        """Open pooled connections up front so the first tool call skips connect and login."""
+
+        count = min_connections or self.min_connections
+        wanted = count - self.engine.pool.checkedout()
+
+        if wanted > 0:
+            # Hold the idle connections while opening new ones, or the checkouts would just reuse them
+            conns = await asyncio.gather(
+                *(self.engine.connect() for _ in range(wanted)),
+                return_exceptions=True
+            )
+
+            for conn in conns:
+                if isinstance(conn, Exception):
+                    self.logger.warning(f"Error prewarming connection: {conn}")
+                else:
+                    # Closing returns the connection to the pool, still open
+                    await conn.close()
+
+            self.logger.info(f"Prewarmed pool to {count} connection(s)")
+
+        self._start_validation()
+
     def _reset_timer(self):
         """Cancel old timer and start a new async task for inactivity timeout."""
         
         if self._timeout_task and not self._timeout_task.done():
             self._timeout_task.cancel()
 
-        self._timeout_task = asyncio.create_task(self._close_after_timeout())
-
-    async def connect(self):
-        """Establish a new async connection and start timeout watchdog."""
-        
-        if not self.conn or self.conn.closed:
-            self.conn = await self.engine.connect()
-            self.logger.info("Connected to database successfully")
-
-        # Start or refresh timeout timer
-        self._reset_timer()
+        self._timeout_task = asyncio.create_task(self._pause_after_timeout(), context=contextvars.Context())
 
-    async def _close_after_timeout(self):
+    async def _pause_after_timeout(self):
         try:
             await asyncio.sleep(self.timeout)
-            await self.close()
-            self.logger.info("Connection closed due to inactivity")
+
+            # The pool stays open; targets that are not kept warm just stop being pinged until the next call
+            if not self.min_connections and self._validation_task and not self._validation_task.done():
+                self._validation_task.cancel()
+                self.logger.info("Pool validation paused due to inactivity")
         except asyncio.CancelledError:
             # Timer was reset before timeout expired
             pass
 
-    async def reconnect(self):
-        """Dispose old engine and reconnect."""
-        
-        await self.close()
-        self.engine = create_async_engine(self.conn_string, pool_pre_ping=True)
-        self.conn = await self.engine.connect()
-        self.logger.info("Reconnected to database successfully")
-
     async def close(self):
-        """Close connection and engine."""
+        """Dispose the engine and stop background tasks."""
         
-        if self.conn and not self.conn.closed:
-            await self.conn.close()
+        # Connections behind cancelled statements go back before the pool is disposed
+        if self._discard_tasks:
+            await asyncio.gather(*self._discard_tasks, return_exceptions=True)
         if self.engine:
             await self.engine.dispose()
+        if self._validation_task and not self._validation_task.done():
+            self._validation_task.cancel()
         if self._timeout_task and not self._timeout_task.done():
             self._timeout_task.cancel()
 
-        self.logger.info("Connection closed due to inactivity")
+        self.logger.info("Connection pool closed")
+
+    def _server_timeout(self, deadline: float) -> int:
+        """Whole seconds, kept below the client deadline so the server cancels first."""
+
+        return max(1, math.floor(max(deadline / 2, deadline - settings.server_timeout_margin)))
+
+    async def _set_server_timeout(self, conn: AsyncConnection, seconds: int):
+        """Apply a server-side statement timeout, skipping the round trip when it is already set."""
+
+        # info lives as long as the DBAPI connection, across pool checkouts
+        if conn.info.get("server_timeout") == seconds:
+            return
 
-    async def execute(self, query: str, **params):
-        """Execute query and reset silence timer."""
+        dialect = self.engine.dialect.name
+
+        if dialect == "mssql":
+            await conn.exec_driver_sql(f"SET LOCK_TIMEOUT {seconds * 1000}")
+
+            # pyodbc query timeout: the ODBC driver cancels the statement itself
+            raw = await conn.get_raw_connection()
+            odbc_conn = getattr(raw.driver_connection, "_conn", None)
+            if odbc_conn is not None:
+                odbc_conn.timeout = seconds
+        elif dialect == "postgresql":
+            await conn.exec_driver_sql(f"SET statement_timeout = {seconds * 1000}")
+        elif dialect == "mysql":
+            await conn.exec_driver_sql(f"SET SESSION MAX_EXECUTION_TIME = {seconds * 1000}")
+
+        conn.info["server_timeout"] = seconds
+
+    def _cancel_statement(self, conn: AsyncConnection, statement: asyncio.Task):
+        """Abort a statement that missed its deadline at the driver, from the event loop thread."""
+
+        driver = self.engine.dialect.driver
+
+        try:
+            # Both drivers run the statement on a worker thread; closing the connection there
+            # would queue behind it, so interrupt it in place and let it fail on its own
+            if driver == "aiosqlite":
+                conn.sync_connection.connection.driver_connection._conn.interrupt()
+                return
+            if driver == "aioodbc":
+                # SQLCancel is safe to call while the statement runs on another thread
+                conn.info["cursor"]._cursor._impl.cancel()
+                return
+        except Exception as e:
+            self.logger.warning(f"Error cancelling statement at the driver: {e}")
+
+        # asyncpg and psycopg send a cancel request to the server when the awaiting task is cancelled
+        statement.cancel()
+
+    def _discard(self, conn: AsyncConnection, statement: asyncio.Task):
+        """Drop the connection once the cancelled statement has returned, without holding the caller."""
+
+        async def _wait_and_invalidate():
+            try:
+                await asyncio.wait({statement}, timeout=self.deadline)
+
+                if not statement.done():
+                    self.logger.warning("Cancelled statement did not return, cancelling its task")
+                    statement.cancel()
+                    await asyncio.wait({statement})
+
+                await conn.invalidate()
+                await conn.close()
+            except Exception as e:
+                self.logger.warning(f"Error discarding connection: {e}")
+
+        # The statement's own error is expected here; retrieve it so it is not reported as unhandled
+        statement.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        task = asyncio.create_task(_wait_and_invalidate(), context=contextvars.Context())
+        self._discard_tasks.add(task)
+        task.add_done_callback(self._discard_tasks.discard)
+
+    async def _execute_with_deadline(self, query: str, params: dict, deadline: float, autocommit: bool = False):
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + deadline
+
+        # Each call checks out its own pooled connection, so concurrent calls never share one
+        with span("connect"):
+            conn = await asyncio.wait_for(self.engine.connect(), timeout=deadline)
+
+        discarded = False
+
+        try:
+            # Needed for statements that cannot run in a transaction (RECONFIGURE, event sessions)
+            if autocommit:
+                await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+            await self._set_server_timeout(conn, self._server_timeout(deadline))
+
+            started = time.perf_counter()
+
+            # Not wait_for: cancelling the task first would make SQLAlchemy close the
+            # connection while the driver is still busy with the statement
+            statement = asyncio.create_task(conn.execute(text(query), params))
+
+            try:
+                with span("execute"):
+                    await asyncio.wait({statement}, timeout=max(0, expires_at - loop.time()))
+            finally:
+                # Missed the deadline or the caller was cancelled; the server timeout should have fired first
+                if not statement.done():
+                    self.logger.warning(f"Query exceeded deadline of {deadline:.1f}s, cancelling and discarding connection")
+                    self._cancel_statement(conn, statement)
+                    self._discard(conn, statement)
+                    discarded = True
+
+            if discarded:
+                raise asyncio.TimeoutError(f"Query exceeded deadline of {deadline:.1f}s")
+
+            result = statement.result()
+            conn.info.pop("cursor", None)
+
+            # Async results are buffered, so the connection can go back to the pool right away
+            await conn.commit()
+
+            trace = current_trace()
+            if trace is not None:
+                trace.note_statement(query, (time.perf_counter() - started) * 1000)
+
+            return result
+        finally:
+            if not discarded:
+                await conn.close()
+
+    async def execute(
+        self,
+        query: str,
+        deadline: float | None = None,
+        autocommit: bool = False,
+        retry: bool = True,
+        **params
+    ):
+        """Execute query within a deadline (seconds) and reset silence timer."""
         
         self._reset_timer()
+        self._start_validation()
+
+        loop = asyncio.get_running_loop()
+        deadline = deadline or self.deadline
+        expires_at = loop.time() + deadline
 
         try:
-            if not self.conn or self.conn.closed:
-                self.logger.info("No active connection. Connecting...")
-                self.conn = await self.engine.connect()
-                
-            return await self.conn.execute(text(query), params)
-        except Exception as e:
-            self.logger.warning(f"Connection dropped, reconnecting... ({e})")
-            await self.reconnect()
-            return await self.conn.execute(text(query), params)
+            return await self._execute_with_deadline(query, params, deadline, autocommit)
+        except DBAPIError as e:
+            # Only a dropped connection is worth retrying; SQL errors would fail again
+            remaining = expires_at - loop.time()
+            if not retry or not e.connection_invalidated or remaining <= 0:
+                raise
 
-    async def __aenter__(self):
-        if not self.conn or self.conn.closed:
-            await self.connect()
+            self.logger.warning(f"Connection dropped, retrying on a fresh connection... ({e})")
+            return await self._execute_with_deadline(query, params, remaining, autocommit)
 
+    async def fetch(self, query: str, deadline: float | None = None, **params) -> CompactResult:
+        """Execute query and return its rows as a CompactResult."""
+
+        result = await self.execute(query, deadline=deadline, **params)
+
+        with span("fetch"):
+            return CompactResult.from_result(result)
+
+    async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
@@ -0,0 +1,124 @@
+import json
+from typing import Iterator, Sequence
+
+_ENCODE = json.JSONEncoder(default=str, ensure_ascii=False).encode
+
+
+class RowView:
+    """Lightweight view over one row of a CompactResult."""
+
+    __slots__ = ("_result", "_index")
+
+    def __init__(self, result: "CompactResult", index: int):
+        self._result = result
+        self._index = index
+
+    def __getitem__(self, key: int | str):
+        if isinstance(key, str):
+            key = self._result.column_index(key)
+
+        return self._result.data[key][self._index]
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self) -> Iterator:
+        return (column[self._index] for column in self._result.data)
+
+    def __len__(self) -> int:
+        return len(self._result.columns)
+
+    def __repr__(self) -> str:
+        return repr(tuple(self))
+
+    def as_dict(self) -> dict:
+        return dict(zip(self._result.columns, self))
+
+
+class CompactResult:
+    """Column-oriented result set: names are held once, values in one tuple per column."""
+
+    __slots__ = ("columns", "data", "_positions")
+
+    def __init__(self, columns: Sequence[str], data: Sequence[tuple]):
+        self.columns = tuple(columns)
+        self.data = tuple(data)
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+
+    @classmethod
+    def from_rows(cls, columns: Sequence[str], rows: Sequence[Sequence]) -> "CompactResult":
+        if not rows:
+            return cls(columns, tuple(() for _ in columns))
+
+        return cls(columns, tuple(zip(*rows)))
+
+    @classmethod
+    def from_result(cls, result, partition_size: int = 1000) -> "CompactResult":
+        """Drain a SQLAlchemy result partition by partition, never holding all Row objects at once."""
+
+        if not result.returns_rows:
+            return cls((), ())
+
+        columns = tuple(result.keys())
+        data = [[] for _ in columns]
+
+        for partition in result.tuples().partitions(partition_size):
+            for column, values in zip(data, zip(*partition)):
+                column.extend(values)
+
+        return cls(columns, (tuple(column) for column in data))
+
+    def __getstate__(self):
+        return self.columns, self.data
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __len__(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+    def __iter__(self) -> Iterator[RowView]:
+        return (RowView(self, i) for i in range(len(self)))
+
+    def __getitem__(self, key: int | slice):
+        if isinstance(key, slice):
+            return CompactResult(self.columns, tuple(column[key] for column in self.data))
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("row index out of range")
+
+        return RowView(self, key)
+
+    def __repr__(self) -> str:
+        return f"CompactResult(columns={self.columns}, rows={len(self)})"
+
+    def column_index(self, name: str) -> int:
+        return self._positions[name]
+
+    def column(self, name: str) -> tuple:
+        return self.data[self._positions[name]]
+
+    def rows(self) -> Iterator[tuple]:
+        return zip(*self.data)
+
+    def _encoded_rows(self) -> Iterator[str]:
+        # Keys are encoded once; each row is written straight to text
+        keys = [_ENCODE(name) + ":" for name in self.columns]
+
+        for row in self.rows():
+            yield "{" + ",".join(key + _ENCODE(value) for key, value in zip(keys, row)) + "}"
+
+    def iter_ndjson(self) -> Iterator[str]:
+        for line in self._encoded_rows():
+            yield line + "\n"
+
+    def to_json(self) -> str:
+        return "[" + ",".join(self._encoded_rows()) + "]"
@@ -1,3 +1,5 @@
+import asyncio
+import contextvars
 import json
 from pathlib import Path
 from uuid import uuid4
@@ -6,8 +8,12 @@ import aiohttp
 
 from db.connection_string import create_connection_string
 from db.db_connection import DbConnection
+from proxy.blocking_monitor import BlockingMonitor
+from proxy.paging import PageBuffer, page_to_json
+from proxy.snapshots import SnapshotStore
 from utils.config import settings
 from utils.logger import setup_logger
+from utils.tracing import SLOW_CALL_LOGGER, Trace, span, trace_call
 
 # ===================================================
 # Setup
@@ -26,13 +32,29 @@ QUERIES = _load_queries("../queries")
 
 LOGGER = setup_logger("Proxy Logs", "proxy.log")
 
+# Connections are cached per credential uuid so engine pools stay warm
+# across tool calls handled by the same process.
+CONNECTIONS: dict[str, DbConnection] = {}
+
+BLOCKING_MONITORS: dict[str, BlockingMonitor] = {}
+
+RESULT_PAGES = PageBuffer(
+    max_entries=settings.page_buffer_entries,
+    ttl=settings.page_buffer_ttl
+)
+
+HEALTH_SNAPSHOTS = SnapshotStore(max_snapshots=settings.health_snapshots_per_target)
+
+# Plan captures run after the response is returned; keep references until they finish
+PLAN_CAPTURES: set[asyncio.Task] = set()
+
 # ===================================================
 # Credentials and DB Connection Functions
 # ===================================================
 
-def create_connection(conn_string: str) -> DbConnection:
+def create_connection(conn_string: str, min_connections: int = 0) -> DbConnection:
     try:
-        return DbConnection(conn_string)
+        return DbConnection(conn_string, min_connections=min_connections)
     except Exception as e:
         LOGGER.error(f"Error creating connection: {e}")
         raise
@@ -122,7 +144,7 @@ def retrieve_credentials(uuid: str, cred_type: str, vault: bool = False) -> dict
         
         cred_file = settings.db_credentials_path if cred_type == "db" else settings.sn_credentials_path
 
-        with open(cred_file, "r", encoding="utf-8") as f:
+        with span("retrieve_credentials"), open(cred_file, "r", encoding="utf-8") as f:
             for line in f:
                 if not line.strip():
                     continue
@@ -196,16 +218,73 @@ def get_connection_string(uuid: str, vault: bool = False) -> str:
         LOGGER.error(f"Error getting connection string: {e}")
     
 
-def set_current_connection(uuid: str) -> DbConnection:
+def set_current_connection(uuid: str, min_connections: int = 0) -> DbConnection:
     try:
         conn_string = get_connection_string(uuid)
-        db_connection = create_connection(conn_string)
+        db_connection = create_connection(conn_string, min_connections=min_connections)
         
         return db_connection
     except Exception as e:
         LOGGER.error(f"Error setting current connection: {e}")
         raise
 
+def get_connection(uuid: str, min_connections: int = 0) -> DbConnection:
+    db_connection = CONNECTIONS.get(uuid)
+
+    if db_connection is None:
+        db_connection = set_current_connection(uuid, min_connections=min_connections)
+        CONNECTIONS[uuid] = db_connection
+
+    return db_connection
+
+def prewarm_targets() -> list[str]:
+    if settings.prewarm_uuids:
+        return list(settings.prewarm_uuids)
+
+    try:
+        return [cred["uuid"] for cred in settings.db_credentials if cred.get("type") == "db"]
+    except FileNotFoundError as e:
+        LOGGER.warning(f"No credentials to prewarm: {e}")
+        return []
+
+async def prewarm_connections(
+    uuids: list[str] | None = None,
+    min_connections: int = settings.prewarm_min_connections,
+    concurrency: int = settings.prewarm_concurrency
+):
+    if min_connections <= 0:
+        return
+
+    uuids = prewarm_targets() if uuids is None else uuids
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _prewarm(uuid: str):
+        async with semaphore:
+            try:
+                db_connection = get_connection(uuid, min_connections=min_connections)
+                db_connection.min_connections = max(db_connection.min_connections, min_connections)
+                await db_connection.prewarm()
+            except Exception as e:
+                LOGGER.warning(f"Error prewarming connection {uuid}: {e}")
+
+    await asyncio.gather(*(_prewarm(uuid) for uuid in uuids))
+
+    LOGGER.info(f"Prewarmed {len(uuids)} target(s)")
+
+async def close_connections():
+    for monitor in BLOCKING_MONITORS.values():
+        await monitor.stop()
+
+    BLOCKING_MONITORS.clear()
+
+    for uuid, db_connection in list(CONNECTIONS.items()):
+        try:
+            await db_connection.close()
+        except Exception as e:
+            LOGGER.warning(f"Error closing connection {uuid}: {e}")
+
+    CONNECTIONS.clear()
+
     
 # TODO: Wait until vault is ready
 def list_vaults() -> list: 
@@ -216,125 +295,337 @@ def list_vaults() -> list:
 # Database Tools
 # ===================================================
 
-async def check_health(db_connection: DbConnection) -> list:
+def _paginate(result, page_size: int | None) -> str:
+    if not page_size:
+        with span("serialize"):
+            return result.to_json()
+
+    page = RESULT_PAGES.paginate(result, page_size)
+
+    with span("serialize"):
+        return page_to_json(page)
+
+def _read_health_sections(result) -> dict:
+    # FOR JSON output is split across rows of ~2KB each
+    return json.loads("".join(result.data[0]))
+
+def _read_health_report(result) -> dict:
+    # Sections are NVARCHAR variables, so they arrive as JSON strings
+    return {
+        section: json.loads(value) if isinstance(value, str) else value
+        for section, value in _read_health_sections(result).items()
+    }
+
+async def check_health(
+    db_connection: DbConnection,
+    deadline: float | None = None,
+    page_size: int | None = None,
+    delta: bool = False,
+    snapshot_id: str | None = None
+) -> str:
     try:
         # ko nên dính file, nên in-memory
         # hơi dài dòng, nên để trong memory
         # nếu mở file thì mở 1 file lúc khởi tạo
-        result = await db_connection.execute(QUERIES["health_check"])
+        result = await db_connection.fetch(QUERIES["health_check"], deadline=deadline)
 
         LOGGER.info("Health check query executed successfully")
 
-        return result
+        # Delta mode returns only what changed since snapshot_id, plus a new snapshot id
+        if delta or snapshot_id:
+            delta_report = HEALTH_SNAPSHOTS.diff(db_connection.target, _read_health_sections(result), snapshot_id)
+
+            with span("serialize"):
+                return json.dumps(delta_report, default=str)
+
+        # The server already produced JSON; hand it back as-is
+        if not page_size:
+            return "".join(result.data[0])
+
+        report = _read_health_report(result)
+        next_tokens = {}
+
+        for section, value in report.items():
+            if isinstance(value, list) and len(value) > page_size:
+                page = RESULT_PAGES.paginate(value, page_size)
+                report[section] = page["rows"]
+                next_tokens[section] = page["next_token"]
+
+        if next_tokens:
+            report["NextPageTokens"] = next_tokens
+
+        with span("serialize"):
+            return json.dumps(report, default=str)
     except Exception as e:
         LOGGER.error(f"Error checking health: {e}")
 
-async def check_log_space(db_connection: DbConnection):
+async def check_log_space(db_connection: DbConnection, deadline: float | None = None, page_size: int | None = None):
     try:
-        result = await db_connection.execute(QUERIES["log_space"])
+        result = await db_connection.fetch(QUERIES["log_space"], deadline=deadline)
 
         LOGGER.info("Log Space query executed successfully")
 
-        return result
+        return _paginate(result, page_size)
     except Exception as e:
         LOGGER.error(f"Error checking log space: {e}")
 
-async def check_blocking_sessions(db_connection: DbConnection):
+async def check_blocking_sessions(db_connection: DbConnection, deadline: float | None = None, page_size: int | None = None):
     try:
-        result = await db_connection.execute(QUERIES["blocking_sessions"])
+        result = await db_connection.fetch(QUERIES["blocking_session"], deadline=deadline)
 
         LOGGER.info("Blocking Sessions query executed successfully")
 
-        return result
+        return _paginate(result, page_size)
     except Exception as e:
         LOGGER.error(f"Error checking blocking sessions: {e}")
 
-async def check_index_fragmentation(db_connection: DbConnection, db_name: str):
+async def check_index_fragmentation(db_connection: DbConnection, db_name: str, deadline: float | None = None, page_size: int | None = None):
 
     try:
         params = {"db_name": db_name}
-        result = await db_connection.execute(QUERIES["index_frag"], **params)
+        result = await db_connection.fetch(QUERIES["index_frag"], deadline=deadline, **params)
 
         LOGGER.info("Index Fragmentation query executed successfully")
 
-        return result
+        return _paginate(result, page_size)
     except Exception as e:
         LOGGER.error(f"Error checking index frag: {e}")
 
-async def check_db_size(db_connection: DbConnection, db_name: str):
+async def check_db_size(db_connection: DbConnection, db_name: str, deadline: float | None = None, page_size: int | None = None):
     try:
         params = {"db_name": db_name}
-        result = await db_connection.execute(QUERIES["db_size"], **params)
+        result = await db_connection.fetch(QUERIES["db_size"], deadline=deadline, **params)
 
         LOGGER.info("DB Size query executed successfully")
 
-        return result
+        return _paginate(result, page_size)
     except Exception as e:
         LOGGER.error(f"Error checking database size: {e}")
 
-async def change_password(db_connection: DbConnection, login_name: str, new_password: str):
+async def change_password(db_connection: DbConnection, login_name: str, new_password: str, deadline: float | None = None):
 
     try:
         params = {"login_name": login_name, "new_password": new_password}
-        result = await db_connection.execute(QUERIES["change_pwd"], **params)
+        result = await db_connection.fetch(QUERIES["change_pwd"], deadline=deadline, **params)
 
         LOGGER.info("Change Password query executed successfully")
 
-        return result
+        with span("serialize"):
+            return result.to_json()
     except Exception as e:
         LOGGER.error(f"Error changing password: {e}")
 
+async def get_blocking_history(uuid: str, minutes: int | None = None, page_size: int | None = None):
+    try:
+        monitor = BLOCKING_MONITORS.get(uuid)
+
+        # First call sets up the event session; later calls answer from memory
+        if monitor is None:
+            monitor = BlockingMonitor(
+                get_connection(uuid),
+                setup_query=QUERIES["blocking_xe_setup"],
+                read_query=QUERIES["blocking_xe_read"],
+                interval=settings.blocking_monitor_interval,
+                history_size=settings.blocking_history_size,
+                threshold=settings.blocked_process_threshold,
+                configure_threshold=settings.configure_blocked_process_threshold
+            )
+            # Registered before the first await so concurrent first calls share one monitor
+            BLOCKING_MONITORS[uuid] = monitor
+
+        try:
+            await monitor.start()
+        except Exception:
+            if BLOCKING_MONITORS.get(uuid) is monitor:
+                del BLOCKING_MONITORS[uuid]
+            raise
+
+        history = monitor.history(minutes)
+
+        if page_size:
+            page = RESULT_PAGES.paginate(history, page_size)
+
+            with span("serialize"):
+                return page_to_json(page)
+
+        with span("serialize"):
+            return json.dumps(history, default=str)
+    except Exception as e:
+        LOGGER.error(f"Error getting blocking history: {e}")
+
 # ===================================================
 # ServiceNow Tools
 # ===================================================
 
-async def get_sn_users(instance_url: str, username: str, password: str):
-    try:
-        url_users = f"{instance_url}/api/now/table/sys_user"
+async def _get_sn_records(instance_url: str, username: str, password: str, table: str, deadline: float | None = None) -> list[dict]:
+    """Read a ServiceNow table in sysparm_limit batches, up to sn_record_limit records."""
+
+    url = f"{instance_url}/api/now/table/{table}"
+    timeout = aiohttp.ClientTimeout(total=deadline or settings.tool_deadline)
+    records = []
+
+    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(username, password), timeout=timeout) as session:
+        while len(records) < settings.sn_record_limit:
+            limit = min(settings.sn_batch_size, settings.sn_record_limit - len(records))
 
-        async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(username, password)) as session:
             async with session.get(
-                url_users,
+                url,
                 headers={"Accept": "application/json"},
-                params={"sysparm_limit": "5"}
+                params={"sysparm_limit": str(limit), "sysparm_offset": str(len(records))}
             ) as response:
 
-                data = await response.json()
+                data = await response.json(content_type=None)
+
+                # Errors come back as {"error": {...}, "status": "failure"}, not as an empty result
+                if response.status != 200 or not isinstance(data, dict) or "result" not in data:
+                    error = data.get("error", data) if isinstance(data, dict) else data
+                    raise RuntimeError(f"ServiceNow returned {response.status} for {table}: {error}")
+
+            records.extend(data["result"])
+
+            if len(data["result"]) < limit:
+                break
+
+    return records
 
-                return data
+def _sn_result(records: list[dict], page_size: int | None) -> str:
+    if not page_size:
+        with span("serialize"):
+            return json.dumps(records, default=str)
+
+    page = RESULT_PAGES.paginate(records, page_size)
+
+    with span("serialize"):
+        return page_to_json(page)
+
+async def get_sn_users(instance_url: str, username: str, password: str, deadline: float | None = None, page_size: int | None = None) -> str:
+    try:
+        records = await _get_sn_records(instance_url, username, password, "sys_user", deadline)
+
+        return _sn_result(records, page_size)
     except Exception as e:
         LOGGER.error(f"Error getting SN users: {e}")
 
-async def get_sn_roles(instance_url: str, username: str, password: str):
+async def get_sn_roles(instance_url: str, username: str, password: str, deadline: float | None = None, page_size: int | None = None) -> str:
     try:
-        url_roles = f"{instance_url}/api/now/table/sys_user_role"
+        records = await _get_sn_records(instance_url, username, password, "sys_user_role", deadline)
 
-        async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(username, password)) as session:
-            async with session.get(
-                url_roles,
-                headers={"Accept": "application/json"},
-                params={"sysparm_limit": "5"}
-            ) as response:
+        return _sn_result(records, page_size)
+    except Exception as e:
+        LOGGER.error(f"Error getting SN roles: {e}")
 
-                data = await response.json()
+async def get_sn_incidents(instance_url: str, username: str, password: str, deadline: float | None = None, page_size: int | None = None) -> str:
+    try:
+        records = await _get_sn_records(instance_url, username, password, "incident", deadline)
 
-                return data
+        return _sn_result(records, page_size)
     except Exception as e:
-        LOGGER.error(f"Error getting SN roles: {e}")
+        LOGGER.error(f"Error getting SN incidents: {e}")
+
+# ===================================================
+# Result Paging
+# ===================================================
 
-async def get_sn_incidents(instance_url: str, username: str, password: str):
+async def fetch_page(token: str) -> str:
     try:
-        url_incidents = f"{instance_url}/api/now/table/incident"
+        page = RESULT_PAGES.next_page(token)
 
-        async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(username, password)) as session:
-            async with session.get(
-                url_incidents,
-                headers={"Accept": "application/json"},
-                params={"sysparm_limit": "5"}
-            ) as response:
+        with span("serialize"):
+            return page_to_json(page)
+    except Exception as e:
+        LOGGER.error(f"Error fetching page: {e}")
+        raise
 
-                data = await response.json()
+# ===================================================
+# Tool Dispatch
+# ===================================================
 
-                return data
+DB_TOOLS = {
+    "check_health": check_health,
+    "check_log_space": check_log_space,
+    "check_blocking_sessions": check_blocking_sessions,
+    "check_index_fragmentation": check_index_fragmentation,
+    "check_db_size": check_db_size,
+    "change_password": change_password,
+}
+
+SN_TOOLS = {
+    "get_sn_users": get_sn_users,
+    "get_sn_roles": get_sn_roles,
+    "get_sn_incidents": get_sn_incidents,
+}
+
+def _plan_snippet(statement: str) -> str:
+    # Bound parameters are rewritten by the driver, so match on the text before the first one
+    snippet = statement.strip().split(":", 1)[0][:100]
+
+    return snippet.replace("[", "[[]").replace("%", "[%]").replace("_", "[_]")
+
+async def _capture_plan(uuid: str, trace: Trace):
+    db_connection = CONNECTIONS.get(uuid)
+
+    if db_connection is None or not trace.statement or db_connection.engine.dialect.name != "mssql":
+        return
+
+    # sys.dm_exec_query_plan_stats only exists from SQL Server 2019 (15.x)
+    version = db_connection.engine.dialect.server_version_info
+    query = QUERIES["last_query_plan"] if version and version[0] >= 15 else QUERIES["last_cached_plan"]
+
+    try:
+        plans = await db_connection.fetch(query, retry=False, statement=_plan_snippet(trace.statement))
+
+        if len(plans):
+            trace.plan = plans.column("QueryPlan")[0]
+
+            # The call's own slow-call line is already written; the plan follows under the same fingerprint
+            SLOW_CALL_LOGGER.warning(json.dumps({
+                "tool": trace.tool,
+                "target": trace.target,
+                "fingerprint": trace.fingerprint,
+                "plan": trace.plan,
+            }))
     except Exception as e:
-        LOGGER.error(f"Error getting SN incidents: {e}")  
\ No newline at end of file
+        LOGGER.warning(f"Error capturing query plan: {e}")
+
+def _start_plan_capture(uuid: str, trace: Trace):
+    # Fresh context so the capture's statements are not attributed to the finished call
+    task = asyncio.create_task(_capture_plan(uuid, trace), context=contextvars.Context())
+    PLAN_CAPTURES.add(task)
+    task.add_done_callback(PLAN_CAPTURES.discard)
+
+async def _dispatch(uuid: str, tool: str, trace: Trace, **kwargs):
+    # Page buffers are per process; routing by uuid keeps follow-ups on the same worker
+    if tool == "fetch_page":
+        return await fetch_page(**kwargs)
+
+    if tool == "get_blocking_history":
+        return await get_blocking_history(uuid, **kwargs)
+
+    if tool in DB_TOOLS:
+        db_connection = get_connection(uuid)
+        trace.target = db_connection.target
+
+        return await DB_TOOLS[tool](db_connection, **kwargs)
+
+    if tool in SN_TOOLS:
+        cred = retrieve_credentials(uuid=uuid, cred_type="servicenow")
+        trace.target = cred.get("instance_url")
+
+        return await SN_TOOLS[tool](
+            instance_url=cred.get("instance_url"),
+            username=cred.get("username"),
+            password=cred.get("password"),
+            **kwargs
+        )
+
+    raise ValueError(f"Unsupported tool: {tool}")
+
+async def call_tool(uuid: str, tool: str, **kwargs):
+    async with trace_call(tool, kwargs) as trace:
+        result = await _dispatch(uuid, tool, trace, **kwargs)
+
+    # Capturing the plan costs another DMV query; the caller should not wait for it
+    if settings.capture_slow_plans and trace.elapsed_ms >= settings.slow_call_threshold_ms:
+        _start_plan_capture(uuid, trace)
+
+    return result
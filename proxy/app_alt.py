@@ -9,6 +9,7 @@ from db.mssql import create_connection_string_mssql
 from db.mysql import create_connection_string_mysql
 from db.oracle import create_connection_string_oracle
 from db.postgresql import create_connection_string_postgresql
+from db.result import CompactResult
 from db.sqlite import create_connection_string_sqlite
 from utils.logger import setup_logger
 
@@ -78,7 +79,7 @@ def check_health(db_connection: DbConnection) -> list:
 
         LOGGER.info("Health check query executed successfully")
 
-        return [row for row in result]
+        return CompactResult.from_result(result)
     except Exception as e:
         LOGGER.error(f"Error checking health: {e}")
 
@@ -91,7 +92,7 @@ def check_db_size(db_connection: DbConnection, db_name: str):
 
         LOGGER.info("DB Size query executed successfully")
 
-        return [row for row in result]
+        return CompactResult.from_result(result)
     except Exception as e:
         LOGGER.error(f"Error checking database size: {e}")
 
@@ -103,7 +104,7 @@ def check_log_space(db_connection: DbConnection):
 
         LOGGER.info("Log Space query executed successfully")
 
-        return [row for row in result]
+        return CompactResult.from_result(result)
     except Exception as e:
         LOGGER.error(f"Error checking log space: {e}")
 
@@ -115,7 +116,7 @@ def check_blocking_sessions(db_connection: DbConnection):
 
         LOGGER.info("Blocking Sessions query executed successfully")
 
-        return [row for row in result]
+        return CompactResult.from_result(result)
     except Exception as e:
         LOGGER.error(f"Error checking blocking sessions: {e}")
 
@@ -128,7 +129,7 @@ def check_index_fragmentation(db_connection: DbConnection, db_name: str):
 
         LOGGER.info("Index Fragmentation query executed successfully")
 
-        return [row for row in result]
+        return CompactResult.from_result(result)
     except Exception as e:
         LOGGER.error(f"Error checking index frag: {e}")
 
@@ -141,6 +142,6 @@ def change_password(db_connection: DbConnection, login_name: str, new_password:
 
         LOGGER.info("Change Password query executed successfully")
 
-        return [row for row in result]
+        return CompactResult.from_result(result)
     except Exception as e:
         LOGGER.error(f"Error changing password: {e}")
\ No newline at end of file
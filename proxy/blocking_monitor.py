@@ -0,0 +1,229 @@
+import asyncio
+import contextvars
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from db.db_connection import DbConnection
+from utils.logger import setup_logger
+
+LOGGER = setup_logger("Blocking Monitor Logs", "blocking_monitor.log")
+
+# ===================================================
+# Event Parsing
+# ===================================================
+
+def _process_info(process: ET.Element | None) -> dict:
+    if process is None:
+        return {}
+
+    return {
+        "spid": process.get("spid"),
+        "status": process.get("status"),
+        "wait_resource": process.get("waitresource"),
+        "wait_time": int(process.get("waittime") or 0),
+        "lock_mode": process.get("lockMode"),
+        "transaction_id": process.get("xactid"),
+        "host_name": process.get("hostname"),
+        "login_name": process.get("loginname"),
+        "client_app": process.get("clientapp"),
+        "last_batch_started": process.get("lastbatchstarted"),
+        "input_buffer": (process.findtext("inputbuf") or "").strip(),
+    }
+
+def parse_blocked_process_report(event_data: str) -> dict:
+    """Flatten one blocked_process_report event into a plain dict."""
+
+    event = ET.fromstring(event_data)
+    data = {node.get("name"): node.find("value") for node in event.findall("data")}
+
+    report = data["blocked_process"].find("blocked-process-report")
+
+    return {
+        "timestamp": event.get("timestamp"),
+        "database_name": data["database_name"].text if "database_name" in data else None,
+        "duration_ms": int(data["duration"].text or 0) // 1000 if "duration" in data else None,
+        "monitor_loop": report.get("monitorLoop"),
+        "blocked": _process_info(report.find("blocked-process/process")),
+        "blocking": _process_info(report.find("blocking-process/process")),
+    }
+
+def parse_blocked_process_reports(events: list[str]) -> list[dict]:
+    reports = []
+
+    for event_data in events:
+        try:
+            reports.append(parse_blocked_process_report(event_data))
+        except (ET.ParseError, KeyError, AttributeError) as e:
+            LOGGER.warning(f"Skipping unreadable blocked process report: {e}")
+
+    return reports
+
+# ===================================================
+# Monitor
+# ===================================================
+
+class BlockingMonitor:
+    def __init__(
+        self,
+        db_connection: DbConnection,
+        setup_query: str,
+        read_query: str,
+        interval: int = 10,
+        history_size: int = 1000,
+        threshold: int = 5,
+        configure_threshold: bool = False
+    ):
+        self.db_connection = db_connection
+        self.setup_query = setup_query
+        self.read_query = read_query
+        self.interval = interval
+        self.history_size = history_size
+        self.threshold = threshold
+        self.configure_threshold = configure_threshold
+
+        # Watermark into the event_file target
+        self._file_name: str | None = None
+        self._file_offset: int | None = None
+        self._last_timestamp: str | None = None
+
+        # (blocked spid, blocked xactid, blocking spid) -> episode
+        self._episodes: OrderedDict[tuple, dict] = OrderedDict()
+        self._task: asyncio.Task | None = None
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        """Create the event session if needed, catch up once and keep polling.
+
+        Concurrent callers wait for the first one; later calls return right away.
+        """
+
+        async with self._start_lock:
+            if self._task and not self._task.done():
+                return
+
+            result = await self.db_connection.fetch(
+                self.setup_query,
+                autocommit=True,
+                threshold=self.threshold,
+                configure_threshold=self.configure_threshold
+            )
+
+            if len(result) and not result.column("BlockedProcessThreshold")[0]:
+                LOGGER.warning(
+                    "blocked process threshold is 0 on the server, so no reports will fire; "
+                    "set it there or enable configure_blocked_process_threshold"
+                )
+
+            await self.poll()
+
+            # Fresh context so background polls are not attributed to the caller's trace
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOGGER.error(f"Error polling blocked process reports: {e}")
+
+    async def poll(self) -> int:
+        """Read events past the watermark and fold them into the history."""
+
+        rewound = False
+
+        try:
+            events = await self._read()
+        except Exception as e:
+            if self._file_name is None:
+                raise
+
+            # The watermark file was rolled over and deleted; re-read what is left on disk
+            LOGGER.warning(f"Watermark {self._file_name}@{self._file_offset} unreadable, re-reading from start ({e})")
+            self._file_name, self._file_offset = None, None
+            rewound = True
+            events = await self._read()
+
+        if not len(events):
+            return 0
+
+        self._file_name, self._file_offset = events.column("file_name")[-1], events.column("file_offset")[-1]
+
+        # XML parsing is CPU-bound; keep it off the event loop
+        reports = await asyncio.to_thread(parse_blocked_process_reports, list(events.column("event_data")))
+
+        if rewound and self._last_timestamp:
+            reports = [r for r in reports if (r["timestamp"] or "") > self._last_timestamp]
+
+        for report in reports:
+            self._record(report)
+
+        return len(reports)
+
+    async def _read(self):
+        return await self.db_connection.fetch(
+            self.read_query,
+            file_name=self._file_name,
+            file_offset=self._file_offset
+        )
+
+    def _record(self, report: dict):
+        blocked, blocking = report["blocked"], report["blocking"]
+        key = (blocked.get("spid"), blocked.get("transaction_id"), blocking.get("spid"))
+
+        # The report repeats every threshold interval while the block persists
+        episode = self._episodes.pop(key, None)
+
+        if episode is None:
+            episode = {**report, "first_seen": report["timestamp"], "reports": 0}
+
+        episode.update(
+            last_seen=report["timestamp"],
+            duration_ms=report["duration_ms"],
+            monitor_loop=report["monitor_loop"],
+            blocked=blocked,
+            blocking=blocking,
+            reports=episode["reports"] + 1
+        )
+        self._episodes[key] = episode
+
+        if report["timestamp"] and (self._last_timestamp is None or report["timestamp"] > self._last_timestamp):
+            self._last_timestamp = report["timestamp"]
+
+        while len(self._episodes) > self.history_size:
+            self._episodes.popitem(last=False)
+
+    def history(self, minutes: int | None = None) -> list[dict]:
+        """Recent blocking episodes, newest first, each tagged with its chain head."""
+
+        episodes = list(self._episodes.values())
+
+        if minutes:
+            cutoff = (datetime.now(timezone.utc) - timedelta(minutes=minutes)).isoformat()
+            episodes = [e for e in episodes if (e["last_seen"] or "") >= cutoff]
+
+        # Follow blocker -> blocker within the same monitor loop to find the chain head
+        blocked_by = {
+            (e["monitor_loop"], e["blocked"].get("spid")): e["blocking"].get("spid")
+            for e in episodes
+        }
+
+        out = []
+        for episode in reversed(episodes):
+            head, seen = episode["blocking"].get("spid"), set()
+
+            while (episode["monitor_loop"], head) in blocked_by and head not in seen:
+                seen.add(head)
+                head = blocked_by[(episode["monitor_loop"], head)]
+
+            out.append({**episode, "head_blocker_spid": head})
+
+        return out
@@ -0,0 +1,75 @@
+import json
+import secrets
+import time
+from collections import OrderedDict
+from typing import Sequence
+
+
+def page_to_json(page: dict) -> str:
+    """Serialize a page, letting CompactResult rows write their own JSON."""
+
+    rows = page["rows"]
+    rows_json = rows.to_json() if hasattr(rows, "to_json") else json.dumps(rows, default=str)
+
+    return (
+        '{"rows":' + rows_json
+        + ',"next_token":' + json.dumps(page["next_token"])
+        + ',"total_rows":' + str(page["total_rows"]) + "}"
+    )
+
+
+class PageBuffer:
+    """Bounded, TTL-evicted buffer holding the unsent rows of paged results."""
+
+    def __init__(self, max_entries: int = 128, ttl: int = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        # token -> (expires_at, rows, offset, page_size)
+        self._entries: OrderedDict[str, tuple[float, Sequence, int, int]] = OrderedDict()
+
+    def _evict(self):
+        now = time.monotonic()
+
+        for token, (expires_at, *_) in list(self._entries.items()):
+            if expires_at <= now:
+                del self._entries[token]
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _page(self, rows: Sequence, offset: int, page_size: int) -> dict:
+        end = offset + page_size
+        next_token = None
+
+        if end < len(rows):
+            next_token = secrets.token_urlsafe(16)
+            self._entries[next_token] = (time.monotonic() + self.ttl, rows, end, page_size)
+            self._evict()
+
+        return {
+            "rows": rows[offset:end],
+            "next_token": next_token,
+            "total_rows": len(rows),
+        }
+
+    def paginate(self, rows: Sequence, page_size: int) -> dict:
+        """Return the first page and buffer the rest behind a continuation token."""
+
+        if page_size <= 0:
+            raise ValueError(f"Invalid page size: {page_size}")
+
+        return self._page(rows, 0, page_size)
+
+    def next_page(self, token: str) -> dict:
+        """Return the page behind a token. Each token can be used once."""
+
+        self._evict()
+        entry = self._entries.pop(token, None)
+
+        if entry is None:
+            raise ValueError("Unknown or expired page token")
+
+        _, rows, offset, page_size = entry
+
+        return self._page(rows, offset, page_size)
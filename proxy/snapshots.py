@@ -0,0 +1,101 @@
+import hashlib
+import json
+import secrets
+from collections import OrderedDict
+
+# Columns identifying a row within each list section of the health report
+SECTION_KEYS: dict[str, tuple[str, ...]] = {
+    "DbSpace": ("DatabaseName",),
+    "TopTables": ("DatabaseName", "SchemaName", "TableName"),
+    "BlockingNow": ("BlockedSessionId", "BlockerSessionId"),
+    "Deadlocks7d": ("Date",),
+    "FailedJobs7d": ("JobName",),
+    "FailedJobsPerDay7d": ("Date",),
+}
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def _row_hashes(section: str, value) -> dict[tuple, str] | None:
+    key_columns = SECTION_KEYS.get(section)
+
+    if key_columns is None or not isinstance(value, list):
+        return None
+
+    return {
+        tuple(row.get(column) for column in key_columns): _digest(json.dumps(row, sort_keys=True, default=str))
+        for row in value
+    }
+
+
+class SnapshotStore:
+    """Compact per-target snapshots of health reports: one hash per section and per keyed row."""
+
+    def __init__(self, max_snapshots: int = 4):
+        self.max_snapshots = max_snapshots
+
+        # target -> snapshot_id -> section -> (section_hash, row_hashes)
+        self._snapshots: dict[str, OrderedDict[str, dict]] = {}
+
+    def diff(self, target: str, sections: dict[str, str | None], snapshot_id: str | None = None) -> dict:
+        """Compare raw report sections with a previous snapshot and store the result as a new one.
+
+        Unknown or evicted snapshot ids fall back to a full report.
+        """
+
+        snapshots = self._snapshots.setdefault(target, OrderedDict())
+        base = snapshots.get(snapshot_id) if snapshot_id else None
+
+        snapshot = {}
+        changed = {}
+        unchanged = []
+
+        for section, raw in sections.items():
+            section_hash = _digest(raw if raw is not None else "null")
+            previous = base.get(section) if base else None
+
+            # Same text as last time: skip without decoding or re-serializing
+            if previous and previous[0] == section_hash:
+                snapshot[section] = previous
+                unchanged.append(section)
+                continue
+
+            value = json.loads(raw) if isinstance(raw, str) else raw
+            row_hashes = _row_hashes(section, value)
+            snapshot[section] = (section_hash, row_hashes)
+
+            if not previous or row_hashes is None or previous[1] is None:
+                changed[section] = value
+                continue
+
+            key_columns = SECTION_KEYS[section]
+            changed_keys = {key for key, row_hash in row_hashes.items() if previous[1].get(key) != row_hash}
+
+            changed[section] = {
+                "changed": [
+                    row for row in value
+                    if tuple(row.get(column) for column in key_columns) in changed_keys
+                ],
+                "removed": [
+                    dict(zip(key_columns, key))
+                    for key in previous[1].keys() - row_hashes.keys()
+                ],
+            }
+
+        # FOR JSON PATH drops NULL sections, so a section that cleared is simply missing
+        removed_sections = [section for section in base if section not in sections] if base else []
+
+        new_id = secrets.token_urlsafe(12)
+        snapshots[new_id] = snapshot
+
+        while len(snapshots) > self.max_snapshots:
+            snapshots.popitem(last=False)
+
+        return {
+            "snapshot_id": new_id,
+            "base_snapshot_id": snapshot_id if base else None,
+            "sections": changed,
+            "unchanged": unchanged,
+            "removed_sections": removed_sections,
+        }
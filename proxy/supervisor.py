@@ -0,0 +1,324 @@
+import asyncio
+import itertools
+import multiprocessing as mp
+import pickle
+import threading
+import zlib
+
+from proxy import app
+from utils.config import settings
+from utils.logger import setup_logger
+from utils.tracing import span, trace_call
+
+LOGGER = setup_logger("Supervisor Logs", "supervisor.log")
+
+# Spawn (not fork) so workers never inherit the supervisor's event loop
+_CONTEXT = mp.get_context("spawn")
+_STOP = None
+
+# Last message a worker generation puts on the response queue, after all of its results
+_DRAINED = "drained"
+
+# ===================================================
+# Worker Process
+# ===================================================
+
+async def _handle(index: int, responses, call_id: int, uuid: str, tool: str, kwargs: dict):
+    try:
+        # Outer trace so pickling for the response queue is timed alongside the tool phases
+        async with trace_call(tool, kwargs):
+            result = await app.call_tool(uuid, tool, **kwargs)
+
+            with span("pickle"):
+                payload = pickle.dumps(result)
+
+        responses.put((call_id, True, payload))
+    except Exception as e:
+        app.LOGGER.error(f"Worker {index} failed {tool} for {uuid}: {e}")
+        responses.put((call_id, False, f"{type(e).__name__}: {e}"))
+
+async def _serve(index: int, generation: int, workers: int, requests, responses):
+    loop = asyncio.get_running_loop()
+    pending: set[asyncio.Task] = set()
+
+    # Only warm the targets this worker owns; serving starts right away
+    owned = [uuid for uuid in app.prewarm_targets() if route(uuid, workers) == index]
+    prewarm_task = asyncio.create_task(app.prewarm_connections(owned))
+
+    while True:
+        message = await loop.run_in_executor(None, requests.get)
+
+        if message is _STOP:
+            break
+
+        task = asyncio.create_task(_handle(index, responses, *message))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    # Drain in-flight calls before releasing the pools
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    prewarm_task.cancel()
+
+    await app.close_connections()
+
+    responses.put((_DRAINED, index, generation))
+
+def _worker_main(index: int, generation: int, workers: int, requests, responses):
+    asyncio.run(_serve(index, generation, workers, requests, responses))
+
+# ===================================================
+# Supervisor
+# ===================================================
+
+def route(uuid: str, workers: int) -> int:
+    """Map a credential uuid to a stable worker index."""
+
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(uuid.encode("utf-8")) % workers
+
+
+class WorkerSlot:
+    def __init__(self, index: int):
+        self.index = index
+        self.process: mp.Process | None = None
+        self.requests = None
+        self.generation = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+
+
+class Supervisor:
+    def __init__(
+        self,
+        workers: int = settings.worker_count,
+        shutdown_timeout: int = settings.worker_shutdown_timeout,
+        report_interval: int = settings.worker_report_interval
+    ):
+        self.workers = workers
+        self.shutdown_timeout = shutdown_timeout
+        self.report_interval = report_interval
+
+        self._slots = [WorkerSlot(index) for index in range(workers)]
+        self._responses = _CONTEXT.Queue()
+        self._pending: dict[int, tuple[asyncio.Future, int, int]] = {}
+        self._ids = itertools.count()
+
+        # (index, generation) -> set once the reader has seen that generation's drained marker
+        self._drained: dict[tuple[int, int], asyncio.Event] = {}
+        self._stopping = False
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reader: threading.Thread | None = None
+        self._monitor_task: asyncio.Task | None = None
+
+    def _spawn(self, slot: WorkerSlot):
+        slot.requests = _CONTEXT.Queue()
+        slot.generation += 1
+        slot.process = _CONTEXT.Process(
+            target=_worker_main,
+            args=(slot.index, slot.generation, self.workers, slot.requests, self._responses),
+            name=f"proxy-worker-{slot.index}",
+            daemon=True
+        )
+        slot.process.start()
+
+        self._drained[(slot.index, slot.generation)] = asyncio.Event()
+
+        # Notice a crash as soon as it happens, not on the next load report
+        threading.Thread(
+            target=self._watch,
+            args=(slot.process, slot.index, slot.generation),
+            name=f"proxy-watch-{slot.index}",
+            daemon=True
+        ).start()
+
+        LOGGER.info(f"Started worker {slot.index} (pid={slot.process.pid}, generation={slot.generation})")
+
+    def _watch(self, process: mp.Process, index: int, generation: int):
+        process.join()
+
+        try:
+            self._loop.call_soon_threadsafe(self._exited, index, generation)
+        except RuntimeError:
+            # Loop already closed after shutdown
+            pass
+
+    def _exited(self, index: int, generation: int):
+        slot = self._slots[index]
+
+        # Planned restarts and shutdown handle their own workers
+        if self._stopping or slot.generation != generation:
+            return
+
+        LOGGER.warning(f"Worker {index} exited (code={slot.process.exitcode}), restarting")
+        asyncio.create_task(self.restart_worker(index, generation))
+
+    def _read_responses(self):
+        while True:
+            message = self._responses.get()
+
+            if message is _STOP:
+                break
+
+            if message[0] == _DRAINED:
+                self._loop.call_soon_threadsafe(self._finish_drain, *message[1:])
+            else:
+                self._loop.call_soon_threadsafe(self._resolve, *message)
+
+    def _resolve(self, call_id: int, ok: bool, payload):
+        future, index, _ = self._pending.pop(call_id, (None, None, None))
+
+        if future is None:
+            return
+
+        slot = self._slots[index]
+        slot.in_flight -= 1
+
+        if ok:
+            slot.completed += 1
+            if not future.done():
+                future.set_result(pickle.loads(payload))
+        else:
+            slot.failed += 1
+            if not future.done():
+                future.set_exception(RuntimeError(payload))
+
+    def _finish_drain(self, index: int, generation: int):
+        # Every result that generation sent was read before its marker, so what is left never completed
+        for call_id, (future, slot_index, slot_generation) in list(self._pending.items()):
+            if slot_index == index and slot_generation == generation:
+                self._resolve(call_id, False, f"Worker {index} exited before completing the call")
+
+        drained = self._drained.get((index, generation))
+        if drained is not None:
+            drained.set()
+
+    async def _retire(self, process: mp.Process, index: int, generation: int):
+        """Wait for an old worker to exit, then fail whatever it left unanswered."""
+
+        await self._loop.run_in_executor(None, process.join, self.shutdown_timeout)
+
+        if process.is_alive():
+            LOGGER.warning(f"Worker {index} (pid={process.pid}) did not stop in time, terminating")
+            process.terminate()
+            await self._loop.run_in_executor(None, process.join)
+
+        drained = self._drained[(index, generation)]
+
+        # A crashed or terminated worker never sent its marker; queue one behind whatever it did send
+        if not drained.is_set() and process.exitcode != 0:
+            self._responses.put((_DRAINED, index, generation))
+
+        try:
+            await asyncio.wait_for(drained.wait(), timeout=self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            LOGGER.warning(f"Worker {index} (generation={generation}) never reported drained")
+            self._finish_drain(index, generation)
+
+        self._drained.pop((index, generation), None)
+
+    async def start(self):
+        """Spawn the worker processes and start the response reader."""
+
+        self._loop = asyncio.get_running_loop()
+
+        for slot in self._slots:
+            self._spawn(slot)
+
+        self._reader = threading.Thread(target=self._read_responses, name="proxy-responses", daemon=True)
+        self._reader.start()
+
+        self._monitor_task = asyncio.create_task(self._monitor())
+
+    async def call(self, uuid: str, tool: str, **kwargs):
+        """Run a tool on the worker that owns this uuid."""
+
+        slot = self._slots[route(uuid, self.workers)]
+
+        if not slot.process.is_alive():
+            await self.restart_worker(slot.index, slot.generation)
+
+        call_id = next(self._ids)
+        future = self._loop.create_future()
+
+        self._pending[call_id] = (future, slot.index, slot.generation)
+        slot.in_flight += 1
+        slot.requests.put((call_id, uuid, tool, kwargs))
+
+        return await future
+
+    async def restart_worker(self, index: int, generation: int | None = None):
+        """Replace a worker, letting the old process finish its queued calls.
+
+        With a generation, only restart if that generation is still the current one.
+        """
+
+        slot = self._slots[index]
+
+        if generation is not None and slot.generation != generation:
+            return
+
+        old_process, old_requests, old_generation = slot.process, slot.requests, slot.generation
+
+        # New calls go to the replacement while the old worker drains
+        self._spawn(slot)
+        slot.restarts += 1
+
+        if old_process.is_alive():
+            old_requests.put(_STOP)
+
+        await self._retire(old_process, index, old_generation)
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+
+            for stats in self.load():
+                LOGGER.info(f"Worker load: {stats}")
+
+    def load(self) -> list[dict]:
+        return [
+            {
+                "worker": slot.index,
+                "pid": slot.process.pid if slot.process else None,
+                "alive": bool(slot.process and slot.process.is_alive()),
+                "generation": slot.generation,
+                "in_flight": slot.in_flight,
+                "completed": slot.completed,
+                "failed": slot.failed,
+                "restarts": slot.restarts,
+            }
+            for slot in self._slots
+        ]
+
+    async def stop(self):
+        """Stop all workers gracefully and shut down the response reader."""
+
+        self._stopping = True
+
+        if self._monitor_task and not self._monitor_task.done():
+            self._monitor_task.cancel()
+
+        for slot in self._slots:
+            if slot.process and slot.process.is_alive():
+                slot.requests.put(_STOP)
+
+        await asyncio.gather(*(
+            self._retire(slot.process, slot.index, slot.generation)
+            for slot in self._slots
+            if slot.process
+        ))
+
+        self._responses.put(_STOP)
+        await self._loop.run_in_executor(None, self._reader.join)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
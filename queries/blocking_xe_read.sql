@@ -0,0 +1,20 @@
+SET NOCOUNT ON;
+
+-- Resolve the event_file path (default LOG directory, any OS separator)
+DECLARE @Path NVARCHAR(260) = (
+SELECT CAST(t.target_data AS XML).value('(EventFileTarget/File/@name)[1]', 'NVARCHAR(260)')
+FROM sys.dm_xe_sessions s
+JOIN sys.dm_xe_session_targets t
+    ON s.address = t.event_session_address
+WHERE s.name = 'proxy_blocked_process'
+    AND t.target_name = 'event_file'
+);
+SET @Path = LEFT(@Path, CHARINDEX(N'proxy_blocked_process', @Path) - 1) + N'proxy_blocked_process*.xel';
+
+-- Events up to and including the watermark are skipped
+SELECT
+    CAST(event_data AS NVARCHAR(MAX)) AS event_data,
+    file_name,
+    file_offset
+FROM sys.fn_xe_file_target_read_file(@Path, NULL, :file_name, :file_offset)
+WHERE object_name = 'blocked_process_report';
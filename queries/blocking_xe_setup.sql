@@ -0,0 +1,55 @@
+SET NOCOUNT ON;
+
+-----------------------------------------
+-- 1) blocked_process_report only fires when the threshold is set.
+--    It is a server-wide setting, so it is only changed when explicitly allowed.
+-----------------------------------------
+DECLARE @Threshold INT = :threshold;
+DECLARE @Configure BIT = :configure_threshold;
+
+IF @Configure = 1
+    AND (SELECT CAST(value_in_use AS INT) FROM sys.configurations WHERE name = 'blocked process threshold (s)') = 0
+BEGIN
+    DECLARE @ShowAdvanced INT = (SELECT CAST(value_in_use AS INT) FROM sys.configurations WHERE name = 'show advanced options');
+
+    IF @ShowAdvanced = 0
+    BEGIN
+        EXEC sys.sp_configure 'show advanced options', 1;
+        RECONFIGURE;
+    END;
+
+    EXEC sys.sp_configure 'blocked process threshold (s)', @Threshold;
+    RECONFIGURE;
+
+    -- Put show advanced options back the way it was
+    IF @ShowAdvanced = 0
+    BEGIN
+        EXEC sys.sp_configure 'show advanced options', 0;
+        RECONFIGURE;
+    END;
+END;
+
+-----------------------------------------
+-- 2) Event session writing to an event_file target
+-----------------------------------------
+IF NOT EXISTS (SELECT 1 FROM sys.server_event_sessions WHERE name = 'proxy_blocked_process')
+BEGIN
+    CREATE EVENT SESSION [proxy_blocked_process] ON SERVER
+    ADD EVENT sqlserver.blocked_process_report
+    ADD TARGET package0.event_file (
+        SET filename = N'proxy_blocked_process.xel',
+            max_file_size = 16,
+            max_rollover_files = 4
+    )
+    WITH (MAX_DISPATCH_LATENCY = 5 SECONDS, STARTUP_STATE = ON);
+END;
+
+IF NOT EXISTS (SELECT 1 FROM sys.dm_xe_sessions WHERE name = 'proxy_blocked_process')
+    ALTER EVENT SESSION [proxy_blocked_process] ON SERVER STATE = START;
+
+-----------------------------------------
+-- 3) Threshold in effect, so the caller can tell whether reports will fire
+-----------------------------------------
+SELECT CAST(value_in_use AS INT) AS BlockedProcessThreshold
+FROM sys.configurations
+WHERE name = 'blocked process threshold (s)';
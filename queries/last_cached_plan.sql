@@ -0,0 +1,10 @@
+-- Cached (estimated) plan for servers without sys.dm_exec_query_plan_stats
+SELECT TOP 1
+    qs.last_elapsed_time / 1000 AS LastElapsedMs,
+    CAST(qp.query_plan AS NVARCHAR(MAX)) AS QueryPlan
+FROM sys.dm_exec_query_stats qs
+CROSS APPLY sys.dm_exec_sql_text(qs.sql_handle) st
+CROSS APPLY sys.dm_exec_query_plan(qs.plan_handle) qp
+WHERE st.text LIKE N'%' + :statement + N'%'
+    AND st.text NOT LIKE N'%dm_exec_query_plan%'
+ORDER BY qs.last_elapsed_time DESC;
@@ -0,0 +1,11 @@
+-- Last actual plan (SQL Server 2019+), falling back to the cached plan when LAST_QUERY_PLAN_STATS is off
+SELECT TOP 1
+    qs.last_elapsed_time / 1000 AS LastElapsedMs,
+    CAST(COALESCE(ps.query_plan, qp.query_plan) AS NVARCHAR(MAX)) AS QueryPlan
+FROM sys.dm_exec_query_stats qs
+CROSS APPLY sys.dm_exec_sql_text(qs.sql_handle) st
+OUTER APPLY sys.dm_exec_query_plan_stats(qs.plan_handle) ps
+OUTER APPLY sys.dm_exec_query_plan(qs.plan_handle) qp
+WHERE st.text LIKE N'%' + :statement + N'%'
+    AND st.text NOT LIKE N'%dm_exec_query_plan_stats%'
+ORDER BY qs.last_elapsed_time DESC;
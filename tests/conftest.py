@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Settings has required fields; give unit tests harmless values when no .env is present
+for key, value in {
+    "LOG_LEVEL": "WARNING",
+    "LOG_DIR": os.path.join(tempfile.gettempdir(), "proxy-test-logs"),
+    "HOST": "localhost",
+    "USER": "test",
+    "MSSQL_PORT": "1433",
+    "MYSQL_PORT": "3306",
+    "POSTGRE_PORT": "5432",
+    "MSSQL_PASSWORD": "test",
+    "MYSQL_PASSWORD": "test",
+    "POSTGRE_PASSWORD": "test",
+    "MSSQL_DB": "master",
+    "MYSQL_DB": "test_db",
+    "POSTGRE_DB": "test_db",
+    "SERVICENOW_INSTANCE_URL": "https://example.service-now.com",
+    "SERVICENOW_USERNAME": "test",
+    "SERVICENOW_PASSWORD": "test",
+}.items():
+    os.environ.setdefault(key, value)
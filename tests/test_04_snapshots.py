@@ -0,0 +1,92 @@
+import json
+
+from proxy.snapshots import SnapshotStore
+
+BASE = {
+    "ServerInfo": json.dumps({"HostName": "db01"}),
+    "DbSpace": json.dumps([
+        {"DatabaseName": "sales", "FreeSpaceGB": 10.0},
+        {"DatabaseName": "hr", "FreeSpaceGB": 5.0},
+    ]),
+    "BlockingNow": json.dumps([{"BlockedSessionId": 55, "BlockerSessionId": 54}]),
+}
+
+
+def test_first_report_is_full():
+    delta = SnapshotStore().diff("target", BASE)
+
+    assert delta["base_snapshot_id"] is None
+    assert delta["sections"]["DbSpace"][0]["DatabaseName"] == "sales"
+    assert delta["unchanged"] == []
+    assert delta["removed_sections"] == []
+
+
+def test_unchanged_sections_are_skipped():
+    store = SnapshotStore()
+    first = store.diff("target", BASE)
+
+    delta = store.diff("target", BASE, first["snapshot_id"])
+
+    assert delta["base_snapshot_id"] == first["snapshot_id"]
+    assert delta["sections"] == {}
+    assert sorted(delta["unchanged"]) == sorted(BASE)
+
+
+def test_changed_and_removed_rows():
+    store = SnapshotStore()
+    first = store.diff("target", BASE)
+    current = dict(BASE, DbSpace=json.dumps([
+        {"DatabaseName": "sales", "FreeSpaceGB": 2.0},
+        {"DatabaseName": "ops", "FreeSpaceGB": 8.0},
+    ]))
+
+    delta = store.diff("target", current, first["snapshot_id"])
+
+    assert delta["sections"]["DbSpace"] == {
+        "changed": [
+            {"DatabaseName": "sales", "FreeSpaceGB": 2.0},
+            {"DatabaseName": "ops", "FreeSpaceGB": 8.0},
+        ],
+        "removed": [{"DatabaseName": "hr"}],
+    }
+
+
+def test_new_section_is_returned_in_full():
+    store = SnapshotStore()
+    first = store.diff("target", BASE)
+    current = dict(BASE, EOL=json.dumps({"SqlVersion": "SQL Server 2019"}))
+
+    delta = store.diff("target", current, first["snapshot_id"])
+
+    assert delta["sections"] == {"EOL": {"SqlVersion": "SQL Server 2019"}}
+
+
+def test_missing_section_is_reported_removed():
+    store = SnapshotStore()
+    first = store.diff("target", BASE)
+    current = {key: value for key, value in BASE.items() if key != "BlockingNow"}
+
+    delta = store.diff("target", current, first["snapshot_id"])
+
+    assert delta["sections"] == {}
+    assert delta["removed_sections"] == ["BlockingNow"]
+
+
+def test_unknown_snapshot_falls_back_to_full_report():
+    store = SnapshotStore()
+    store.diff("target", BASE)
+
+    delta = store.diff("target", BASE, "no-such-snapshot")
+
+    assert delta["base_snapshot_id"] is None
+    assert set(delta["sections"]) == set(BASE)
+
+
+def test_snapshots_are_bounded_per_target():
+    store = SnapshotStore(max_snapshots=2)
+    first = store.diff("target", BASE)
+    store.diff("target", BASE)
+    store.diff("target", BASE)
+
+    assert store.diff("target", BASE, first["snapshot_id"])["base_snapshot_id"] is None
+    assert store.diff("other", BASE)["base_snapshot_id"] is None
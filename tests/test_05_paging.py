@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from proxy.paging import PageBuffer, page_to_json
+
+
+def test_pages_cover_all_rows():
+    buffer = PageBuffer()
+    rows = list(range(7))
+
+    first = buffer.paginate(rows, 3)
+    second = buffer.next_page(first["next_token"])
+    last = buffer.next_page(second["next_token"])
+
+    assert first["rows"] == [0, 1, 2]
+    assert second["rows"] == [3, 4, 5]
+    assert last["rows"] == [6]
+    assert last["next_token"] is None
+    assert first["total_rows"] == 7
+
+
+def test_exact_page_boundary_has_no_token():
+    page = PageBuffer().paginate(list(range(6)), 3)
+    assert page["next_token"] is not None
+
+    assert PageBuffer().paginate(list(range(3)), 3)["next_token"] is None
+
+
+def test_tokens_are_single_use():
+    buffer = PageBuffer()
+    token = buffer.paginate(list(range(5)), 2)["next_token"]
+    buffer.next_page(token)
+
+    with pytest.raises(ValueError):
+        buffer.next_page(token)
+
+
+def test_invalid_page_size():
+    with pytest.raises(ValueError):
+        PageBuffer().paginate([1, 2], 0)
+
+
+def test_expired_tokens_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("proxy.paging.time.monotonic", lambda: now[0])
+
+    buffer = PageBuffer(ttl=10)
+    token = buffer.paginate(list(range(5)), 2)["next_token"]
+    now[0] += 11
+
+    with pytest.raises(ValueError):
+        buffer.next_page(token)
+
+
+def test_oldest_tokens_are_evicted_when_full():
+    buffer = PageBuffer(max_entries=2)
+    tokens = [buffer.paginate(list(range(5)), 2)["next_token"] for _ in range(3)]
+
+    with pytest.raises(ValueError):
+        buffer.next_page(tokens[0])
+
+    assert buffer.next_page(tokens[2])["rows"] == [2, 3]
+
+
+def test_page_to_json_round_trips():
+    page = PageBuffer().paginate([{"a": 1}, {"a": 2}], 1)
+
+    assert json.loads(page_to_json(page)) == {
+        "rows": [{"a": 1}],
+        "next_token": page["next_token"],
+        "total_rows": 2,
+    }
@@ -0,0 +1,105 @@
+import json
+import pickle
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from db.result import CompactResult
+from proxy.paging import PageBuffer, page_to_json
+
+
+def _result() -> CompactResult:
+    return CompactResult.from_rows(
+        ("DatabaseName", "SizeMB", "CheckedAt"),
+        [
+            ("sales", Decimal("12.50"), datetime(2024, 5, 1, 10, 0)),
+            ("hr", Decimal("3.25"), None),
+            ("ops", Decimal("0"), datetime(2024, 5, 2, 8, 30)),
+        ],
+    )
+
+
+def test_empty_result():
+    result = CompactResult.from_rows(("a", "b"), [])
+
+    assert len(result) == 0
+    assert list(result) == []
+    assert result.to_json() == "[]"
+    assert list(result.iter_ndjson()) == []
+
+
+def test_row_views():
+    result = _result()
+
+    assert len(result) == 3
+    assert result[0]["DatabaseName"] == "sales"
+    assert result[-1].SizeMB == Decimal("0")
+    assert tuple(result[1]) == ("hr", Decimal("3.25"), None)
+    assert result.column("DatabaseName") == ("sales", "hr", "ops")
+
+    with pytest.raises(IndexError):
+        result[3]
+    with pytest.raises(AttributeError):
+        result[0].missing
+
+
+def test_slicing_keeps_columns():
+    page = _result()[1:]
+
+    assert isinstance(page, CompactResult)
+    assert page.columns == ("DatabaseName", "SizeMB", "CheckedAt")
+    assert [row.DatabaseName for row in page] == ["hr", "ops"]
+
+
+def test_to_json_with_decimal_and_datetime():
+    rows = json.loads(_result().to_json())
+
+    assert rows[0] == {"DatabaseName": "sales", "SizeMB": "12.50", "CheckedAt": "2024-05-01 10:00:00"}
+    assert rows[1]["CheckedAt"] is None
+
+
+def test_ndjson_matches_json():
+    result = _result()
+    lines = [json.loads(line) for line in result.iter_ndjson()]
+
+    assert lines == json.loads(result.to_json())
+
+
+def test_pickle_round_trip():
+    result = pickle.loads(pickle.dumps(_result()))
+
+    assert result[0].as_dict()["DatabaseName"] == "sales"
+
+
+def test_paged_result_is_serializable():
+    page = PageBuffer().paginate(_result(), 2)
+    body = json.loads(page_to_json(page))
+
+    assert [row["DatabaseName"] for row in body["rows"]] == ["sales", "hr"]
+    assert body["total_rows"] == 3
+
+
+def test_from_result_builds_tuple_columns():
+    engine = create_engine("sqlite://")
+
+    with engine.connect() as conn:
+        result = CompactResult.from_result(
+            conn.execute(text("SELECT 1 AS a, 'x' AS b UNION ALL SELECT 2, 'y' UNION ALL SELECT 3, 'z'")),
+            partition_size=2
+        )
+
+    assert result.columns == ("a", "b")
+    assert result.column("a") == (1, 2, 3)
+    assert all(type(column) is tuple for column in result.data)
+
+
+def test_from_result_without_rows():
+    engine = create_engine("sqlite://")
+
+    with engine.connect() as conn:
+        result = CompactResult.from_result(conn.execute(text("CREATE TABLE t (a INTEGER)")))
+
+    assert len(result) == 0
+    assert result.to_json() == "[]"
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import time
+import zlib
+
+import pytest
+from aiohttp import web
+
+from proxy.supervisor import Supervisor, route
+
+UUID = "104d10c3-a765-4fb9-bd70-ebcf34c34c7d"
+
+
+def test_route_is_stable():
+    assert route(UUID, 4) == route(UUID, 4)
+    # crc32, not the per-process salted hash()
+    assert route(UUID, 4) == zlib.crc32(UUID.encode("utf-8")) % 4
+
+
+def test_route_stays_in_range_and_spreads():
+    uuids = [f"00000000-0000-0000-0000-{i:012d}" for i in range(200)]
+    workers = {route(uuid, 4) for uuid in uuids}
+
+    assert workers == {0, 1, 2, 3}
+
+
+# ===================================================
+# Worker processes, against a local ServiceNow stand-in
+# ===================================================
+
+@pytest.fixture
+def sn_server(tmp_path, monkeypatch):
+    """Fake instance on a free port; spawned workers read its credentials from SN_CREDENTIALS_PATH."""
+
+    credentials = tmp_path / "sn_credentials.jsonl"
+    monkeypatch.setenv("SN_CREDENTIALS_PATH", str(credentials))
+
+    state = {"delay": 0}
+
+    async def users(request: web.Request) -> web.Response:
+        await asyncio.sleep(state["delay"])
+        return web.json_response({"result": [{"user_name": "alice"}, {"user_name": "bob"}]})
+
+    async def serve() -> web.AppRunner:
+        app = web.Application()
+        app.router.add_get("/api/now/table/sys_user", users)
+
+        # Don't wait on handlers still sleeping for a killed worker
+        runner = web.AppRunner(app, shutdown_timeout=0.1)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+
+        credentials.write_text(json.dumps({
+            "uuid": UUID,
+            "type": "servicenow",
+            "value": {"instance_url": f"http://127.0.0.1:{runner.addresses[0][1]}", "username": "u", "password": "p"},
+        }) + "\n")
+
+        return runner
+
+    state["serve"] = serve
+
+    return state
+
+
+def _run(sn_server, scenario, workers: int = 1):
+    async def main():
+        runner = await sn_server["serve"]()
+        try:
+            async with Supervisor(workers=workers, shutdown_timeout=10, report_interval=3600) as supervisor:
+                await scenario(supervisor, sn_server)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(asyncio.wait_for(main(), timeout=60))
+
+
+def test_calls_are_dispatched_to_the_owning_worker(sn_server):
+    async def scenario(supervisor: Supervisor, server: dict):
+        result = await supervisor.call(UUID, "get_sn_users")
+
+        assert [user["user_name"] for user in json.loads(result)] == ["alice", "bob"]
+
+        load = supervisor.load()
+        assert load[route(UUID, 2)]["completed"] == 1
+        assert load[1 - route(UUID, 2)]["completed"] == 0
+
+    _run(sn_server, scenario, workers=2)
+
+
+def test_restart_drains_in_flight_calls(sn_server):
+    async def scenario(supervisor: Supervisor, server: dict):
+        # Warm the worker up so the call below is already running when the restart begins
+        await supervisor.call(UUID, "get_sn_users")
+        server["delay"] = 1
+
+        call = asyncio.create_task(supervisor.call(UUID, "get_sn_users"))
+        await asyncio.sleep(0.5)
+        await supervisor.restart_worker(0)
+
+        result = await call
+        assert len(json.loads(result)) == 2
+
+        stats = supervisor.load()[0]
+        assert stats["generation"] == 2
+        assert stats["failed"] == 0
+
+        # The replacement serves new calls
+        server["delay"] = 0
+        assert len(json.loads(await supervisor.call(UUID, "get_sn_users"))) == 2
+
+    _run(sn_server, scenario)
+
+
+def test_crashed_worker_fails_its_calls_and_is_replaced(sn_server):
+    async def scenario(supervisor: Supervisor, server: dict):
+        await supervisor.call(UUID, "get_sn_users")
+        server["delay"] = 30
+
+        call = asyncio.create_task(supervisor.call(UUID, "get_sn_users"))
+        await asyncio.sleep(0.5)
+
+        started = time.perf_counter()
+        supervisor._slots[0].process.kill()
+
+        # Noticed right away, not on the next load report (report_interval is an hour here)
+        with pytest.raises(RuntimeError, match="exited before completing"):
+            await call
+
+        assert time.perf_counter() - started < 10
+
+        server["delay"] = 0
+        assert len(json.loads(await supervisor.call(UUID, "get_sn_users"))) == 2
+        assert supervisor.load()[0]["restarts"] == 1
+
+    _run(sn_server, scenario)
@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+from db.result import CompactResult
+from proxy import app
+from proxy.blocking_monitor import BlockingMonitor, parse_blocked_process_report, parse_blocked_process_reports
+
+EVENT = """
+<event name="blocked_process_report" package="sqlserver" timestamp="2024-05-01T10:00:00.123Z">
+  <data name="duration"><value>20000000</value></data>
+  <data name="database_name"><value>sales</value></data>
+  <data name="blocked_process">
+    <value>
+      <blocked-process-report monitorLoop="42">
+        <blocked-process>
+          <process id="process1" waitresource="KEY: 5:72057594043236352 (8194443284a0)" waittime="20000"
+                   spid="55" lockMode="S" xactid="9001" hostname="app01" loginname="reporting"
+                   clientapp="report-job" lastbatchstarted="2024-05-01T09:59:40">
+            <inputbuf>SELECT * FROM dbo.Orders WHERE OrderId = 1</inputbuf>
+          </process>
+        </blocked-process>
+        <blocking-process>
+          <process status="sleeping" spid="54" xactid="9000" hostname="app02" loginname="writer">
+            <inputbuf>UPDATE dbo.Orders SET Status = 2 WHERE OrderId = 1</inputbuf>
+          </process>
+        </blocking-process>
+      </blocked-process-report>
+    </value>
+  </data>
+</event>
+"""
+
+
+def test_parse_blocked_process_report():
+    report = parse_blocked_process_report(EVENT)
+
+    assert report["timestamp"] == "2024-05-01T10:00:00.123Z"
+    assert report["database_name"] == "sales"
+    assert report["duration_ms"] == 20000
+    assert report["monitor_loop"] == "42"
+
+    assert report["blocked"]["spid"] == "55"
+    assert report["blocked"]["lock_mode"] == "S"
+    assert report["blocked"]["wait_time"] == 20000
+    assert report["blocked"]["input_buffer"] == "SELECT * FROM dbo.Orders WHERE OrderId = 1"
+
+    assert report["blocking"]["spid"] == "54"
+    assert report["blocking"]["status"] == "sleeping"
+    assert report["blocking"]["input_buffer"].startswith("UPDATE dbo.Orders")
+
+
+def test_unreadable_events_are_skipped():
+    reports = parse_blocked_process_reports([EVENT, "<event", "<event name='x'/>"])
+
+    assert len(reports) == 1
+
+
+# ===================================================
+# Monitor, against a stand-in connection
+# ===================================================
+
+def _events(*rows) -> CompactResult:
+    return CompactResult.from_rows(("event_data", "file_name", "file_offset"), list(rows))
+
+
+def _event(timestamp: str, spid: int = 55) -> str:
+    return EVENT.replace("2024-05-01T10:00:00.123Z", timestamp).replace('spid="55"', f'spid="{spid}"')
+
+
+class FakeConnection:
+    def __init__(self, reads=(), threshold: int = 5):
+        self.setup_calls = []
+        self.reads = []
+        self.threshold = threshold
+        self._reads = list(reads)
+
+    async def fetch(self, query: str, **params):
+        if query == "setup":
+            self.setup_calls.append(params)
+            await asyncio.sleep(0.05)
+            return CompactResult.from_rows(("BlockedProcessThreshold",), [(self.threshold,)])
+
+        self.reads.append(params)
+        read = self._reads.pop(0) if self._reads else _events()
+
+        if isinstance(read, Exception):
+            raise read
+        return read
+
+
+def test_concurrent_first_calls_share_one_monitor(monkeypatch):
+    async def main():
+        connection = FakeConnection()
+
+        monkeypatch.setattr(app, "BLOCKING_MONITORS", {})
+        monkeypatch.setattr(app, "get_connection", lambda uuid: connection)
+        monkeypatch.setitem(app.QUERIES, "blocking_xe_setup", "setup")
+        monkeypatch.setitem(app.QUERIES, "blocking_xe_read", "read")
+
+        try:
+            results = await asyncio.gather(*(app.get_blocking_history("uuid") for _ in range(5)))
+        finally:
+            for monitor in app.BLOCKING_MONITORS.values():
+                await monitor.stop()
+
+        assert [json.loads(result) for result in results] == [[]] * 5
+        assert len(app.BLOCKING_MONITORS) == 1
+        assert len(connection.setup_calls) == 1
+
+    asyncio.run(main())
+
+
+def test_setup_does_not_reconfigure_the_server_by_default():
+    async def main():
+        connection = FakeConnection(threshold=0)
+        monitor = BlockingMonitor(connection, "setup", "read", threshold=7)
+
+        await monitor.start()
+        await monitor.stop()
+
+        assert connection.setup_calls == [{"autocommit": True, "threshold": 7, "configure_threshold": False}]
+
+    asyncio.run(main())
+
+
+def test_rolled_over_watermark_rereads_without_duplicates():
+    async def main():
+        connection = FakeConnection(reads=[
+            _events((_event("2024-05-01T10:00:00.000Z", spid=55), "a.xel", 100)),
+            RuntimeError("file a.xel no longer exists"),
+            _events(
+                (_event("2024-05-01T10:00:00.000Z", spid=55), "b.xel", 10),
+                (_event("2024-05-01T10:00:05.000Z", spid=56), "b.xel", 20),
+            ),
+        ])
+        monitor = BlockingMonitor(connection, "setup", "read")
+
+        assert await monitor.poll() == 1
+        assert await monitor.poll() == 1
+
+        # The re-read starts from the beginning of what is on disk
+        assert connection.reads[1] == {"file_name": "a.xel", "file_offset": 100}
+        assert connection.reads[2] == {"file_name": None, "file_offset": None}
+
+        assert [episode["blocked"]["spid"] for episode in monitor.history()] == ["56", "55"]
+        assert (monitor._file_name, monitor._file_offset) == ("b.xel", 20)
+
+    asyncio.run(main())
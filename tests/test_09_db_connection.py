@@ -0,0 +1,208 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from db.db_connection import DbConnection
+
+# Runs for minutes unless interrupted
+ENDLESS = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+    "SELECT max(x) FROM c"
+)
+
+
+def _connection(tmp_path, **kwargs) -> DbConnection:
+    return DbConnection(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", validation_interval=0, **kwargs)
+
+
+def test_fetch_returns_rows(tmp_path):
+    async def main():
+        db = _connection(tmp_path)
+        try:
+            result = await db.fetch("SELECT 1 AS a, 'x' AS b")
+        finally:
+            await db.close()
+
+        assert result.columns == ("a", "b")
+        assert tuple(result[0]) == (1, "x")
+
+    asyncio.run(main())
+
+
+def test_deadline_raises_without_waiting_for_the_statement(tmp_path):
+    async def main():
+        db = _connection(tmp_path, deadline=5)
+        try:
+            started = time.perf_counter()
+
+            with pytest.raises(asyncio.TimeoutError):
+                await db.fetch(ENDLESS, deadline=0.5)
+
+            assert time.perf_counter() - started < 2
+
+            # The pool is still usable right away
+            assert len(await db.fetch("SELECT 1 AS a")) == 1
+        finally:
+            await db.close()
+
+    asyncio.run(asyncio.wait_for(main(), timeout=30))
+
+
+def test_deadline_cancels_the_statement_at_the_driver(tmp_path):
+    async def main():
+        db = _connection(tmp_path, deadline=5)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await db.fetch(ENDLESS, deadline=0.5)
+
+            # Interrupted, the statement returns long before the discard task would give up on it
+            started = time.perf_counter()
+            await asyncio.gather(*db._discard_tasks)
+
+            assert time.perf_counter() - started < 2
+            assert db.engine.pool.checkedout() == 0
+        finally:
+            await db.close()
+
+    asyncio.run(asyncio.wait_for(main(), timeout=30))
+
+
+def test_dropped_connection_is_retried_once(tmp_path, monkeypatch):
+    async def main():
+        db = _connection(tmp_path)
+        calls = []
+        execute_with_deadline = db._execute_with_deadline
+
+        async def flaky(query, params, deadline, autocommit=False):
+            calls.append(deadline)
+            if len(calls) == 1:
+                raise DBAPIError(query, params, Exception("connection reset"), connection_invalidated=True)
+            return await execute_with_deadline(query, params, deadline, autocommit)
+
+        monkeypatch.setattr(db, "_execute_with_deadline", flaky)
+
+        try:
+            result = await db.fetch("SELECT 1 AS a", deadline=5)
+        finally:
+            await db.close()
+
+        assert len(result) == 1
+        assert len(calls) == 2
+        # The retry only gets what is left of the deadline
+        assert calls[1] <= calls[0]
+
+    asyncio.run(main())
+
+
+def test_no_retry_when_disabled(tmp_path, monkeypatch):
+    async def main():
+        db = _connection(tmp_path)
+        calls = []
+
+        async def dropped(query, params, deadline, autocommit=False):
+            calls.append(deadline)
+            raise DBAPIError(query, params, Exception("connection reset"), connection_invalidated=True)
+
+        monkeypatch.setattr(db, "_execute_with_deadline", dropped)
+
+        try:
+            with pytest.raises(DBAPIError):
+                await db.fetch("SELECT 1 AS a", retry=False)
+        finally:
+            await db.close()
+
+        assert len(calls) == 1
+
+    asyncio.run(main())
+
+
+def test_sql_errors_are_not_retried(tmp_path, monkeypatch):
+    async def main():
+        db = _connection(tmp_path)
+        calls = []
+        execute_with_deadline = db._execute_with_deadline
+
+        async def counted(query, params, deadline, autocommit=False):
+            calls.append(deadline)
+            return await execute_with_deadline(query, params, deadline, autocommit)
+
+        monkeypatch.setattr(db, "_execute_with_deadline", counted)
+
+        try:
+            with pytest.raises(OperationalError):
+                await db.fetch("SELECT * FROM missing_table")
+        finally:
+            await db.close()
+
+        assert len(calls) == 1
+
+    asyncio.run(main())
+
+
+def test_prewarm_tops_up_around_idle_connections(tmp_path):
+    async def main():
+        db = _connection(tmp_path, min_connections=3)
+        try:
+            # One idle connection already in the pool
+            await db.fetch("SELECT 1 AS a")
+            assert db.engine.pool.checkedin() == 1
+
+            await db.prewarm()
+            assert db.engine.pool.checkedin() == 3
+
+            await db.prewarm()
+            assert db.engine.pool.checkedin() == 3
+        finally:
+            await db.close()
+
+    asyncio.run(main())
+
+
+def test_validate_pool_reconnects_dropped_connections(tmp_path):
+    async def main():
+        db = _connection(tmp_path, min_connections=3)
+        connects = []
+        event.listen(db.engine.sync_engine, "connect", lambda *args: connects.append(1))
+
+        try:
+            await db.prewarm()
+            assert len(connects) == 3
+
+            conn = await db.engine.connect()
+            await conn.invalidate()
+            await conn.close()
+
+            await db.validate_pool()
+            assert len(connects) == 4
+            assert db.engine.pool.checkedin() == 3
+
+            # Tool calls find the pool already reconnected
+            await db.fetch("SELECT 1 AS a")
+            assert len(connects) == 4
+        finally:
+            await db.close()
+
+    asyncio.run(main())
+
+
+def test_idle_timeout_keeps_the_pool(tmp_path):
+    async def main():
+        db = DbConnection(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", timeout=0.1, validation_interval=3600)
+        connects = []
+        event.listen(db.engine.sync_engine, "connect", lambda *args: connects.append(1))
+
+        try:
+            await db.fetch("SELECT 1 AS a")
+            await asyncio.sleep(0.3)
+
+            # Validation stops for an idle target, but its pooled connection is reused
+            assert db._validation_task.done()
+            await db.fetch("SELECT 1 AS a")
+            assert len(connects) == 1
+        finally:
+            await db.close()
+
+    asyncio.run(main())
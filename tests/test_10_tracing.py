@@ -0,0 +1,87 @@
+import asyncio
+
+from db.result import CompactResult
+from proxy import app
+from utils.config import settings
+from utils.tracing import current_trace, fingerprint, span, trace_call
+
+
+def test_fingerprint_masks_passwords():
+    assert fingerprint({"login_name": "sa", "new_password": "a"}) == fingerprint({"login_name": "sa", "new_password": "b"})
+    assert fingerprint({"login_name": "sa"}) != fingerprint({"login_name": "dbo"})
+
+
+def test_nested_calls_share_the_outer_trace():
+    async def main():
+        async with trace_call("outer", {}) as outer:
+            async with trace_call("inner", {}) as inner:
+                with span("execute"):
+                    pass
+
+        assert inner is outer
+        assert [name for name, _ in outer.spans] == ["execute"]
+
+    asyncio.run(main())
+
+
+def test_serialization_is_timed():
+    async def main():
+        result = CompactResult.from_rows(("a",), [(1,), (2,), (3,)])
+
+        async with trace_call("check_log_space", {}) as trace:
+            app._paginate(result, None)
+            app._paginate(result, 2)
+
+        assert [name for name, _ in trace.spans] == ["serialize", "serialize"]
+
+    asyncio.run(main())
+
+
+def test_plan_capture_runs_after_the_call_returns(monkeypatch):
+    async def main():
+        release = asyncio.Event()
+        captured = []
+
+        async def slow_dispatch(uuid, tool, trace, **kwargs):
+            trace.note_statement("SELECT 1", 5)
+            await asyncio.sleep(0.02)
+            return "[]"
+
+        async def capture_plan(uuid, trace):
+            await release.wait()
+            captured.append((trace.tool, current_trace()))
+
+        monkeypatch.setattr(app, "_dispatch", slow_dispatch)
+        monkeypatch.setattr(app, "_capture_plan", capture_plan)
+        monkeypatch.setattr(settings, "capture_slow_plans", True)
+        monkeypatch.setattr(settings, "slow_call_threshold_ms", 10)
+
+        assert await app.call_tool("uuid", "check_log_space") == "[]"
+
+        # Returned while the capture is still waiting
+        assert captured == []
+        assert len(app.PLAN_CAPTURES) == 1
+
+        release.set()
+        await asyncio.gather(*app.PLAN_CAPTURES)
+
+        # Detached from the finished call's trace
+        assert captured == [("check_log_space", None)]
+
+    asyncio.run(main())
+
+
+def test_fast_calls_skip_plan_capture(monkeypatch):
+    async def main():
+        async def fast_dispatch(uuid, tool, trace, **kwargs):
+            return "[]"
+
+        monkeypatch.setattr(app, "_dispatch", fast_dispatch)
+        monkeypatch.setattr(settings, "capture_slow_plans", True)
+        monkeypatch.setattr(settings, "slow_call_threshold_ms", 10_000)
+
+        await app.call_tool("uuid", "check_log_space")
+
+        assert not app.PLAN_CAPTURES
+
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+
+from proxy import app
+from utils.config import settings
+
+INCIDENTS = [{"number": f"INC{i:07d}"} for i in range(250)]
+
+
+def _run(scenario):
+    """Serve a fake instance and run scenario(instance_url, requests) against it."""
+
+    requests = []
+
+    async def incidents(request: web.Request) -> web.Response:
+        limit, offset = int(request.query["sysparm_limit"]), int(request.query["sysparm_offset"])
+        requests.append((limit, offset))
+        return web.json_response({"result": INCIDENTS[offset:offset + limit]})
+
+    async def users(request: web.Request) -> web.Response:
+        return web.json_response(
+            {"error": {"message": "User Not Authenticated", "detail": "Required to provide Auth information"}, "status": "failure"},
+            status=401
+        )
+
+    async def main():
+        server = web.Application()
+        server.router.add_get("/api/now/table/incident", incidents)
+        server.router.add_get("/api/now/table/sys_user", users)
+
+        runner = web.AppRunner(server)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+
+        try:
+            await scenario(f"http://127.0.0.1:{runner.addresses[0][1]}", requests)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def test_records_are_read_in_batches(monkeypatch):
+    monkeypatch.setattr(settings, "sn_batch_size", 100)
+
+    async def scenario(instance_url, requests):
+        records = await app._get_sn_records(instance_url, "u", "p", "incident")
+
+        assert records == INCIDENTS
+        assert requests == [(100, 0), (100, 100), (100, 200)]
+
+    _run(scenario)
+
+
+def test_record_limit_caps_the_read(monkeypatch):
+    monkeypatch.setattr(settings, "sn_batch_size", 100)
+    monkeypatch.setattr(settings, "sn_record_limit", 120)
+
+    async def scenario(instance_url, requests):
+        records = await app._get_sn_records(instance_url, "u", "p", "incident")
+
+        assert len(records) == 120
+        assert requests == [(100, 0), (20, 100)]
+
+    _run(scenario)
+
+
+def test_incidents_are_paged(monkeypatch):
+    monkeypatch.setattr(settings, "sn_batch_size", 100)
+
+    async def scenario(instance_url, requests):
+        first = json.loads(await app.get_sn_incidents(instance_url, "u", "p", page_size=50))
+
+        assert [row["number"] for row in first["rows"]] == [row["number"] for row in INCIDENTS[:50]]
+        assert first["total_rows"] == 250
+
+        second = json.loads(await app.fetch_page(first["next_token"]))
+        assert second["rows"][0]["number"] == "INC0000050"
+
+    _run(scenario)
+
+
+def test_unpaged_incidents_are_json_text(monkeypatch):
+    monkeypatch.setattr(settings, "sn_record_limit", 10)
+
+    async def scenario(instance_url, requests):
+        result = await app.get_sn_incidents(instance_url, "u", "p")
+
+        assert isinstance(result, str)
+        assert json.loads(result) == INCIDENTS[:10]
+
+    _run(scenario)
+
+
+def test_error_payloads_are_raised():
+    async def scenario(instance_url, requests):
+        with pytest.raises(RuntimeError, match="401.*User Not Authenticated"):
+            await app._get_sn_records(instance_url, "u", "p", "sys_user")
+
+        # The tool logs and returns nothing rather than an empty page
+        assert await app.get_sn_users(instance_url, "u", "p", page_size=10) is None
+
+    _run(scenario)
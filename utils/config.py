@@ -30,6 +30,34 @@ class Settings(BaseSettings):
     db_credentials_path: str = "../config/db_credentials.jsonl"
     sn_credentials_path: str = "../config/sn_credentials.jsonl"
 
+    worker_count: int = 4
+    worker_shutdown_timeout: int = 30
+    worker_report_interval: int = 60
+
+    tool_deadline: float = 30.0
+    server_timeout_margin: float = 1.0
+
+    page_buffer_entries: int = 128
+    page_buffer_ttl: int = 300
+
+    sn_record_limit: int = 1000
+    sn_batch_size: int = 100
+
+    prewarm_uuids: list[str] = []
+    prewarm_min_connections: int = 0
+    prewarm_concurrency: int = 8
+    pool_validation_interval: int = 60
+
+    blocking_monitor_interval: int = 10
+    blocking_history_size: int = 1000
+    blocked_process_threshold: int = 5
+    configure_blocked_process_threshold: bool = False
+
+    slow_call_threshold_ms: int = 1000
+    capture_slow_plans: bool = False
+
+    health_snapshots_per_target: int = 4
+
     _db_cache: list[dict] | None = None
     _sn_cache: list[dict] | None = None
     
@@ -0,0 +1,108 @@
+import contextvars
+import hashlib
+import json
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from .config import settings
+from .logger import setup_logger
+
+SLOW_CALL_LOGGER = setup_logger("Slow Calls", "slow_calls.log")
+
+_CURRENT: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("trace", default=None)
+
+
+def fingerprint(params: dict) -> str:
+    """Stable short hash of tool parameters, with secrets masked out."""
+
+    masked = {
+        key: "***" if "password" in key.lower() else value
+        for key, value in params.items()
+    }
+    canonical = json.dumps(masked, sort_keys=True, default=str)
+
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+class Trace:
+    def __init__(self, tool: str, params: dict):
+        self.tool = tool
+        self.target: str | None = None
+        self.fingerprint = fingerprint(params)
+        self.spans: list[tuple[str, float]] = []
+
+        # Slowest statement seen during the call, for plan capture
+        self.statement: str | None = None
+        self.statement_ms = 0.0
+        self.plan: str | None = None
+
+        self._started = time.perf_counter()
+        self.total_ms: float | None = None
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def add(self, name: str, elapsed_ms: float):
+        self.spans.append((name, round(elapsed_ms, 2)))
+
+    def note_statement(self, statement: str, elapsed_ms: float):
+        if elapsed_ms >= self.statement_ms:
+            self.statement, self.statement_ms = statement, elapsed_ms
+
+    def as_dict(self) -> dict:
+        return {
+            "tool": self.tool,
+            "target": self.target,
+            "fingerprint": self.fingerprint,
+            "total_ms": round(self.total_ms if self.total_ms is not None else self.elapsed_ms, 2),
+            "spans": [{"name": name, "ms": ms} for name, ms in self.spans],
+            "plan": self.plan,
+        }
+
+
+def current_trace() -> Trace | None:
+    return _CURRENT.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time a phase of the current tool call. No-op outside a trace."""
+
+    trace = _CURRENT.get()
+
+    if trace is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, (time.perf_counter() - started) * 1000)
+
+
+@asynccontextmanager
+async def trace_call(tool: str, params: dict):
+    """Trace a tool call and log it if it exceeds the slow-call threshold.
+
+    Nested calls reuse the outer trace so the outermost caller owns the log line.
+    """
+
+    trace = _CURRENT.get()
+
+    if trace is not None:
+        yield trace
+        return
+
+    trace = Trace(tool, params)
+    token = _CURRENT.set(trace)
+
+    try:
+        yield trace
+    finally:
+        _CURRENT.reset(token)
+        trace.total_ms = trace.elapsed_ms
+
+        if trace.total_ms >= settings.slow_call_threshold_ms:
+            SLOW_CALL_LOGGER.warning(json.dumps(trace.as_dict(), default=str))